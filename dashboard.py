@@ -1,10 +1,12 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import glob, os
+import os
 from datetime import datetime, date
 import plotly.express as px
 import plotly.graph_objects as go
 import json
+from streamlit_autorefresh import st_autorefresh
 
 # Page config for mobile-friendly design
 st.set_page_config(
@@ -43,36 +45,58 @@ with st.sidebar:
     st.header("🎛️ Controls")
     auto_refresh = st.checkbox("Auto Refresh (30s)", value=True)
     if auto_refresh:
-        st.rerun()
-    
+        # Client-side timer; doesn't pin a server thread per session
+        st_autorefresh(interval=30_000, key="refresh")
+
     st.header("📋 Quick Stats")
     
+def tail_lines(path, n=50, blocksize=8192):
+    """Read the last n lines of a file without loading the whole thing."""
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        chunks = []
+        newlines = 0
+        pos = size
+        while pos > 0 and newlines <= n:
+            read_size = min(blocksize, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+        data = b''.join(reversed(chunks))
+    return data.decode(errors='ignore').splitlines()[-n:]
+
+@st.cache_data(ttl=30)
+def latest_report_path():
+    """Find the newest daily report with one scandir pass (stat info comes for free)."""
+    entries = [(e.name, e.stat().st_ctime) for e in os.scandir('.')
+               if e.name.startswith('daily_trade_report_') and e.name.endswith('.csv')]
+    return max(entries, key=lambda x: x[1])[0] if entries else None
+
 # Load latest data function
 @st.cache_data(ttl=30)  # Cache for 30 seconds
 def load_bot_data():
     """Load trading bot data from files"""
     data = {
-        'daily_reports': [],
+        'trades': pd.DataFrame(),
         'log_entries': [],
         'sentiment': 'Neutral',
         'active_positions': 0
     }
-    
+
     # Load daily trade reports
     try:
-        report_files = glob.glob('daily_trade_report_*.csv')
-        if report_files:
-            latest_report = max(report_files, key=os.path.getctime)
-            df = pd.read_csv(latest_report)
-            data['daily_reports'] = df.to_dict('records')
+        latest_report = latest_report_path()
+        if latest_report:
+            data['trades'] = pd.read_csv(latest_report)
     except:
         pass
     
     # Load log entries (last 50 lines)
     try:
-        with open('trading_bot.log', 'r') as f:
-            lines = f.readlines()
-            data['log_entries'] = lines[-50:] if lines else []
+        data['log_entries'] = tail_lines('trading_bot.log', n=50)
     except:
         pass
     
@@ -81,18 +105,24 @@ def load_bot_data():
 # Load data
 bot_data = load_bot_data()
 
-# Main dashboard layout
+# Main dashboard layout - one vectorized pass over the trades DataFrame
+trades_df = bot_data['trades']
+trade_count = len(trades_df)
+has_pnl = 'pnl' in trades_df.columns
+total_pnl = trades_df['pnl'].sum() if has_pnl else 0
+winning_trades = int((trades_df['pnl'] > 0).sum()) if has_pnl else 0
+win_rate = (winning_trades / trade_count * 100) if trade_count else 0
+
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     st.metric(
         label="🎯 Total Trades Today",
-        value=len(bot_data['daily_reports']),
-        delta=f"+{len(bot_data['daily_reports'])}"
+        value=trade_count,
+        delta=f"+{trade_count}"
     )
 
 with col2:
-    total_pnl = sum(trade.get('pnl', 0) for trade in bot_data['daily_reports'])
     st.metric(
         label="💰 Today's P&L (₹)",
         value=f"₹{total_pnl:.2f}",
@@ -100,12 +130,10 @@ with col2:
     )
 
 with col3:
-    winning_trades = len([t for t in bot_data['daily_reports'] if t.get('pnl', 0) > 0])
-    win_rate = (winning_trades / len(bot_data['daily_reports']) * 100) if bot_data['daily_reports'] else 0
     st.metric(
         label="🏆 Win Rate",
         value=f"{win_rate:.1f}%",
-        delta=f"{winning_trades}/{len(bot_data['daily_reports'])}"
+        delta=f"{winning_trades}/{trade_count}"
     )
 
 with col4:
@@ -115,59 +143,59 @@ with col4:
     )
 
 # Charts section
-if bot_data['daily_reports']:
+if not trades_df.empty:
     st.header("📈 Trading Performance")
-    
-    # Create DataFrame for charts
-    trades_df = pd.DataFrame(bot_data['daily_reports'])
-    
+
     col1, col2 = st.columns(2)
-    
-    with col1:
-        # P&L by Stock
-        if 'symbol' in trades_df.columns and 'pnl' in trades_df.columns:
-            pnl_by_stock = trades_df.groupby('symbol')['pnl'].sum().reset_index()
-            pnl_by_stock = pnl_by_stock.sort_values('pnl', ascending=False).head(10)
-            
-            fig = px.bar(
-                pnl_by_stock,
-                x='symbol',
-                y='pnl',
-                title="📊 Top 10 Stocks by P&L",
-                color='pnl',
-                color_continuous_scale=['red', 'yellow', 'green']
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        # Trade Distribution
-        if 'signal' in trades_df.columns:
-            signal_counts = trades_df['signal'].value_counts()
-            
-            fig = px.pie(
-                values=signal_counts.values,
-                names=signal_counts.index,
-                title="🎯 Trade Distribution",
-                color_discrete_map={'BUY': '#00ff00', 'SELL': '#ff4444'}
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+
+    # Stable placeholders so Plotly.js can diff instead of rebuilding the DOM
+    pnl_chart = col1.empty()
+    pie_chart = col2.empty()
+
+    # P&L by Stock - discrete colors instead of a gradient scale keeps
+    # Plotly on the cheap render path, and uirevision preserves pan/zoom
+    if 'symbol' in trades_df.columns and 'pnl' in trades_df.columns:
+        pnl_by_stock = trades_df.groupby('symbol')['pnl'].sum()
+        pnl_by_stock = pnl_by_stock.sort_values(ascending=False).head(10)
+        pnl_values = pnl_by_stock.values
+
+        fig = go.Figure(go.Bar(
+            x=pnl_by_stock.index.values,
+            y=pnl_values,
+            marker_color=np.where(pnl_values > 0, '#00ff00', '#ff4444')
+        ))
+        fig.update_layout(title="📊 Top 10 Stocks by P&L", height=400,
+                          uirevision='constant')
+        pnl_chart.plotly_chart(fig, use_container_width=True)
+
+    # Trade Distribution - cap slices to top-5 plus "Other"
+    if 'signal' in trades_df.columns:
+        signal_counts = trades_df['signal'].value_counts()
+        if len(signal_counts) > 5:
+            top = signal_counts.head(5)
+            signal_counts = pd.concat([top, pd.Series({'Other': signal_counts.iloc[5:].sum()})])
+
+        fig = px.pie(
+            values=signal_counts.values,
+            names=signal_counts.index,
+            title="🎯 Trade Distribution",
+            color_discrete_map={'BUY': '#00ff00', 'SELL': '#ff4444'}
+        )
+        fig.update_layout(height=400, uirevision='constant')
+        pie_chart.plotly_chart(fig, use_container_width=True)
 
 # Recent trades table
-if bot_data['daily_reports']:
+if not trades_df.empty:
     st.header("📋 Recent Trades")
+
+    recent_trades = trades_df.tail(10)
     
-    recent_trades = pd.DataFrame(bot_data['daily_reports']).tail(10)
-    
-    # Style the dataframe
-    def color_pnl(val):
-        if isinstance(val, (int, float)):
-            return 'color: green' if val > 0 else 'color: red' if val < 0 else 'color: orange'
-        return ''
-    
+    # Style the dataframe - one NumPy pass per column instead of per-cell calls
+    def color_pnl_col(s):
+        return np.where(s > 0, 'color: green', np.where(s < 0, 'color: red', 'color: orange'))
+
     if 'pnl' in recent_trades.columns:
-        styled_trades = recent_trades.style.applymap(color_pnl, subset=['pnl'])
+        styled_trades = recent_trades.style.apply(color_pnl_col, subset=['pnl'])
         st.dataframe(styled_trades, use_container_width=True)
     else:
         st.dataframe(recent_trades, use_container_width=True)
@@ -196,9 +224,8 @@ col1, col2 = st.columns(2)
 with col1:
     if st.button("📥 Download Today's Report"):
         try:
-            report_files = glob.glob('daily_trade_report_*.csv')
-            if report_files:
-                latest_report = max(report_files, key=os.path.getctime)
+            latest_report = latest_report_path()
+            if latest_report:
                 with open(latest_report, 'rb') as f:
                     st.download_button(
                         label="💾 Download CSV",
@@ -230,9 +257,3 @@ st.markdown("""
     📱 Mobile Friendly | 🔄 Auto-refreshing every 30 seconds
 </div>
 """, unsafe_allow_html=True)
-
-# Auto refresh
-if auto_refresh:
-    import time
-    time.sleep(30)
-    st.rerun()
@@ -1,14 +1,13 @@
-import os, glob, csv, time, re
+import os, glob, csv, time, re, asyncio, threading
+import numpy as np
 import pandas as pd
-import requests, yfinance as yf
+import aiohttp, yfinance as yf
 from datetime import datetime
-from textblob import TextBlob
 import talib
 from dotenv import load_dotenv
-import logging, schedule
+import logging
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from bs4 import BeautifulSoup
-import backtrader as bt
+from lxml import etree
 
 # ===== CONFIG =====
 load_dotenv()
@@ -18,12 +17,15 @@ CAPITAL = 100000
 RISK_PER_TRADE = 0.01
 POSITIVE_WORDS = ["rally","highs","bullish","gains","optimism","rate cut"]
 NEGATIVE_WORDS = ["drop","crash","bearish","losses","concerns","sell-off"]
+_POS_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, POSITIVE_WORDS)) + r')\b', re.IGNORECASE)
+_NEG_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, NEGATIVE_WORDS)) + r')\b', re.IGNORECASE)
 
 logging.basicConfig(level=logging.INFO, filename="trading_bot.log",
                     format="%(asctime)s - %(message)s")
 vader_analyzer = SentimentIntensityAnalyzer()
 active_positions = {}
 trade_history = {}
+_positions_lock = threading.Lock()  # trading and monitoring run on separate tasks
 
 # ===== ROBUST NSE CSV LOADER =====
 def load_symbols_from_nse_files(folder_path="nse_sector_files"):
@@ -53,9 +55,14 @@ def load_symbols_from_nse_files(folder_path="nse_sector_files"):
                 print(f"Skipping {file}: No SYMBOL header found")
                 continue
 
-            # Read CSV from header row
-            df = pd.read_csv(file, skiprows=header_row_idx, dtype=str, 
-                           engine='python', encoding='utf-8-sig')
+            # Read CSV from header row; pyarrow parses ~5-10x faster than
+            # the python engine, fall back to the C engine if unavailable
+            try:
+                df = pd.read_csv(file, skiprows=header_row_idx, dtype=str,
+                               engine='pyarrow', encoding='utf-8-sig')
+            except Exception:
+                df = pd.read_csv(file, skiprows=header_row_idx, dtype=str,
+                               engine='c', encoding='utf-8-sig', on_bad_lines='skip')
             
             # Clean column names - remove quotes, spaces, newlines
             df.columns = [re.sub(r'["\s\n\r]', '', str(c)).upper() for c in df.columns]
@@ -72,25 +79,13 @@ def load_symbols_from_nse_files(folder_path="nse_sector_files"):
                       .str.strip()
                       .str.upper())
             
-            # Filter valid symbols
-            mask = (
-                symbols.notna() &
-                (symbols != '') &
-                (symbols != '-') &
-                (~symbols.str.startswith('NIFTY')) &
-                (~symbols.str.startswith('BANKNIFTY')) &
-                (~symbols.str.startswith('FINNIFTY'))
-            )
-            
+            # Filter valid symbols in one vectorized pass: drop index names,
+            # keep alphabetic symbols plus those with & (like M&MFIN)
+            mask = symbols.str.match(r'^(?!NIFTY|BANKNIFTY|FINNIFTY)[A-Z&]+$', na=False)
             valid_symbols = symbols[mask].unique()
-            count = 0
-            for sym in valid_symbols:
-                # Keep alphabetic symbols or those with & character (like M&MFIN)
-                if sym.replace('&', '').replace('M', '').isalpha() or '&' in sym:
-                    tickers[sym + ".NS"] = sym.lower()
-                    count += 1
-            
-            print(f"Loaded {count} symbols from {os.path.basename(file)}")
+            tickers.update({sym + ".NS": sym.lower() for sym in valid_symbols})
+
+            print(f"Loaded {len(valid_symbols)} symbols from {os.path.basename(file)}")
             
         except Exception as e:
             print(f"Skipping {file}: {e}")
@@ -99,181 +94,292 @@ def load_symbols_from_nse_files(folder_path="nse_sector_files"):
     return tickers
 
 # ===== NEWS SOURCES =====
-def fetch_news(query):
+FETCH_SEM = asyncio.Semaphore(16)
+_http_session = None
+
+def get_http_session():
+    """Shared aiohttp session so warm TCP/TLS connections persist across cycles."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32),
+            timeout=aiohttp.ClientTimeout(total=10))
+    return _http_session
+
+async def fetch_news(session, query):
     if not NEWS_API_KEY: return []
     try:
-        r = requests.get(f"https://newsapi.org/v2/everything?q={query}&language=en&apiKey={NEWS_API_KEY}")
-        return r.json().get("articles", []) if r.status_code==200 else []
+        async with FETCH_SEM:
+            async with session.get(f"https://newsapi.org/v2/everything?q={query}&language=en&apiKey={NEWS_API_KEY}") as r:
+                return (await r.json()).get("articles", []) if r.status==200 else []
     except: return []
 
-def fetch_finnhub_news():
+async def fetch_finnhub_news(session):
     if not FINNHUB_API_KEY: return []
     try:
-        r = requests.get(f"https://finnhub.io/api/v1/news?category=general&token={FINNHUB_API_KEY}")
-        if r.status_code == 200:
-            return [{"description": a.get("headline","")} for a in r.json()]
+        async with FETCH_SEM:
+            async with session.get(f"https://finnhub.io/api/v1/news?category=general&token={FINNHUB_API_KEY}") as r:
+                if r.status == 200:
+                    return [{"description": a.get("headline","")} for a in await r.json()]
     except: return []
     return []
 
-def fetch_rss_news(url):
+async def fetch_rss_news(session, url):
     try:
-        r = requests.get(url, timeout=10)
-        if r.status_code==200:
-            soup = BeautifulSoup(r.content, "xml")
-            return [{"description": item.title.text} for item in soup.find_all("item")]
+        async with FETCH_SEM:
+            async with session.get(url) as r:
+                r.raise_for_status()
+                root = etree.fromstring(await r.read())
+                return [{"description": t.text} for t in root.iterfind('.//item/title') if t.text]
     except: return []
     return []
 
-def get_all_news():
+async def get_all_news():
     today = datetime.now().strftime("%Y-%m-%d")
-    articles=[]
     feeds = [
         "https://economictimes.indiatimes.com/markets/rssfeeds/1977021501.cms",
         "https://www.moneycontrol.com/rss/marketreports.xml",
         "https://www.livemint.com/rss/markets"
     ]
-    articles += fetch_news(f"global stock market {today}")
-    articles += fetch_news(f"Indian stock market {today}")
-    articles += fetch_finnhub_news()
-    for f in feeds: articles += fetch_rss_news(f)
+    session = get_http_session()
+    tasks = [fetch_news(session, f"global stock market {today}"),
+             fetch_news(session, f"Indian stock market {today}"),
+             fetch_finnhub_news(session)]
+    tasks += [fetch_rss_news(session, f) for f in feeds]
+    results = await asyncio.gather(*tasks)
+    articles=[]
+    for r in results: articles += r
     return articles
 
 # ===== SENTIMENT ANALYSIS =====
-def analyze_sentiment(text):
-    if not text.strip(): return 0.0
+_TICKER_RE = None
+_TICKER_MAP = {}
+
+def build_ticker_index(stocks):
+    """Precompile one alternation regex over all ticker names for single-pass matching."""
+    global _TICKER_RE, _TICKER_MAP
+    _TICKER_MAP = {}
+    for s, n in stocks.items():
+        _TICKER_MAP[n] = s
+        _TICKER_MAP[s.split('.')[0].lower()] = s
+    keys = sorted(_TICKER_MAP, key=len, reverse=True)  # longest match first
+    _TICKER_RE = re.compile("|".join(map(re.escape, keys)))
+
+def find_mentioned_stocks(text_lower):
+    if _TICKER_RE is None: return set()
+    return {_TICKER_MAP[m] for m in _TICKER_RE.findall(text_lower)}
+
+def analyze_sentiment(texts):
+    """Score each text with VADER; returns a NumPy array of compound scores."""
+    texts = [t for t in texts if t.strip()]
+    if not texts: return np.zeros(1)
     try:
-        return (TextBlob(text).sentiment.polarity +
-                vader_analyzer.polarity_scores(text)['compound'])/2
+        return np.array([vader_analyzer.polarity_scores(t)['compound'] for t in texts])
     except:
-        pos = sum(text.lower().count(w) for w in POSITIVE_WORDS)
-        neg = sum(text.lower().count(w) for w in NEGATIVE_WORDS)
+        pos = np.array([len(_POS_RE.findall(t)) for t in texts])
+        neg = np.array([len(_NEG_RE.findall(t)) for t in texts])
         return (pos-neg)/(pos+neg+1)
 
-def fetch_and_analyze_sentiment():
-    scores=[]; mentioned=[]
-    for _ in range(3):
-        text = " ".join([(a.get("description") or "") for a in get_all_news()])
-        sc = analyze_sentiment(text)
-        scores.append(sc)
-        mentioned += [s for s,n in ALL_STOCKS.items()
-                      if n in text.lower() or s.split('.')[0].lower() in text.lower()]
-    avg = sum(scores)/len(scores)
+_sentiment_ema = None
+
+async def fetch_and_analyze_sentiment():
+    global _sentiment_ema
+    descriptions = [(a.get("description") or "") for a in await get_all_news()]
+    raw = float(np.mean(analyze_sentiment(descriptions)))
+    # Smooth across schedule ticks instead of re-polling the same feeds
+    _sentiment_ema = raw if _sentiment_ema is None else 0.7*_sentiment_ema + 0.3*raw
+    avg = _sentiment_ema
+    mentioned = find_mentioned_stocks(" ".join(descriptions).lower())
     sent = "Bullish" if avg>0.2 else "Bearish" if avg<-0.2 else "Neutral"
-    uniq = list(set(mentioned)) or list(ALL_STOCKS.keys())[:5]
+    uniq = list(mentioned) or list(ALL_STOCKS)[:5]
     logging.info(f"Sentiment: {sent} ({avg:.2f}) | {uniq}")
     return sent, avg, uniq
 
+# ===== PRICE DATA CACHE =====
+PRICE_TTL = 60  # seconds
+_price_cache = {}
+
+def get_bars_batch(symbols):
+    """Download 5m bars for all symbols in one yfinance call and cache them."""
+    symbols = [s for s in symbols if s not in _price_cache
+               or time.time() - _price_cache[s][0] > PRICE_TTL]
+    if not symbols: return
+    try:
+        data = yf.download(tickers=symbols, period="5d", interval="5m",
+                           group_by='ticker', threads=True, progress=False)
+        now = time.time()
+        for sym in symbols:
+            # yfinance returns MultiIndex columns (ticker at level 0) even for
+            # a single symbol on recent versions, so branch on the shape
+            df = data[sym] if isinstance(data.columns, pd.MultiIndex) else data
+            df = df.dropna()
+            if not df.empty: _price_cache[sym] = (now, df)
+    except Exception as e:
+        logging.warning(f"Batch download failed for {symbols}: {e}")
+
+def get_bars(symbol):
+    cached = _price_cache.get(symbol)
+    if cached and time.time() - cached[0] <= PRICE_TTL:
+        return cached[1]
+    get_bars_batch([symbol])
+    cached = _price_cache.get(symbol)
+    return cached[1] if cached else None
+
 # ===== BACKTEST STRATEGY =====
-class VWAPRSIStrategy(bt.Strategy):
-    params = (("rsi_period",14),("vwap_period",20),)
-    def __init__(self):
-        self.rsi = bt.indicators.RSI(self.data.close, period=self.p.rsi_period)
-        self.vwap = bt.ind.WMA(self.data.close*self.data.volume, period=self.p.vwap_period)/ \
-                     bt.ind.WMA(self.data.volume, period=self.p.vwap_period)
-    def next(self):
-        if not self.position:
-            if self.data.close>self.vwap and self.rsi<70: self.buy()
-            elif self.data.close<self.vwap and self.rsi>30: self.sell()
-        else:
-            if self.position.size>0 and (self.data.close<self.vwap or self.rsi>70): self.close()
-            elif self.position.size<0 and (self.data.close>self.vwap or self.rsi<30): self.close()
-
-def backtest_vwap_rsi(symbol):
+def extract_bars(df):
+    """Pull raw NumPy arrays out of a bar DataFrame once so every kernel shares them."""
+    return {'h': df['High'].values.astype(float),
+            'l': df['Low'].values.astype(float),
+            'c': df['Close'].values.astype(float),
+            'v': df['Volume'].values.astype(float)}
+
+def backtest_vwap_rsi(symbol, rsi_period=14, vwap_period=20, stake=10):
+    """Vectorized VWAP/RSI backtest: long above VWAP while RSI<70, short below while RSI>30."""
     try:
-        df = yf.download(symbol, period="5d", interval="5m")
-        if df.empty: return None, None
-        df.dropna(inplace=True)
-        cb = bt.Cerebro()
-        cb.addstrategy(VWAPRSIStrategy)
-        cb.adddata(bt.feeds.PandasData(dataname=df))
-        cb.broker.set_cash(100000)
-        cb.addsizer(bt.sizers.FixedSize, stake=10)
-        start=cb.broker.getvalue(); cb.run(); end=cb.broker.getvalue()
-        return end-start, df
+        df = get_bars(symbol)
+        if df is None or df.empty: return None, None
+        bars = extract_bars(df)
+        c, v = bars['c'], bars['v']
+        w = np.ones(vwap_period)
+        vwap = np.convolve(c*v, w, 'valid') / np.convolve(v, w, 'valid')
+        rsi = talib.RSI(c, timeperiod=rsi_period)
+        close, rsi = c[vwap_period-1:], rsi[vwap_period-1:]
+        long_entry = (close > vwap) & (rsi < 70)
+        short_entry = (close < vwap) & (rsi > 30)
+        position = np.where(long_entry, 1, np.where(short_entry, -1, 0))
+        pnl = np.nansum(position[:-1] * np.diff(close)) * stake
+        bars['atr'] = calculate_atr(bars)
+        return pnl, bars
     except: return None, None
 
 # ===== ATR & TRADING =====
-def calculate_atr(df, period=14):
-    try: return talib.ATR(df['High'], df['Low'], df['Close'], timeperiod=period).dropna().iloc[-1]
+def calculate_atr(bars, period=14):
+    try:
+        atr = talib.ATR(bars['h'], bars['l'], bars['c'], timeperiod=period)
+        atr = atr[~np.isnan(atr)]
+        return atr[-1] if len(atr) else None
     except: return None
 
-def place_trade(symbol, signal, sentiment, df):
-    atr = calculate_atr(df)
+def place_trade(symbol, signal, sentiment, bars):
+    atr = bars.get('atr') or calculate_atr(bars)
     if not atr or atr==0: return
     qty = int((CAPITAL*RISK_PER_TRADE)/(atr*1.5))
     if qty<1: return
     if (sentiment=="Bearish" and signal=="BUY") or (sentiment=="Bullish" and signal=="SELL"): return
-    entry = df['Close'].iloc[-1]
+    entry = bars['c'][-1]
     sl = entry - atr*1.5 if signal=="BUY" else entry + atr*1.5
-    active_positions[symbol] = {"signal":signal,"qty":qty,"entry_price":entry,"stop_loss":sl}
+    with _positions_lock:
+        active_positions[symbol] = {"signal":signal,"qty":qty,"entry_price":entry,"stop_loss":sl}
     print(f"{datetime.now()} | {symbol} | {signal} | Qty:{qty} | SL:{sl:.2f}")
     logging.info(f"Placed {signal} {symbol} | Entry:{entry:.2f} | SL:{sl:.2f}")
 
+REPORT_FIELDS = ['symbol','signal','qty','entry_price','exit_price','pnl','exit_time']
+_report_file = None
+_report_writer = None
+_report_date = None
+
+def append_trade_report(trade):
+    """Append one trade row to today's report CSV, opening it lazily."""
+    global _report_file, _report_writer, _report_date
+    today = datetime.now().date()
+    if _report_file is None or _report_date != today:
+        if _report_file: _report_file.close()
+        filename = f"daily_trade_report_{today.strftime('%Y-%m-%d')}.csv"
+        write_header = not os.path.exists(filename) or os.path.getsize(filename)==0
+        _report_file = open(filename, 'a', newline='')
+        _report_writer = csv.DictWriter(_report_file, REPORT_FIELDS)
+        if write_header: _report_writer.writeheader()
+        _report_date = today
+    _report_writer.writerow(trade)
+    _report_file.flush()
+
 def exit_trade(symbol, price):
-    pos = active_positions.pop(symbol, None)
+    with _positions_lock:
+        pos = active_positions.pop(symbol, None)
     if pos:
         pnl = pos['qty']*(price-pos['entry_price']) if pos['signal']=="BUY" else pos['qty']*(pos['entry_price']-price)
-        trade_history.setdefault(datetime.now().date(), []).append(
-            {'symbol':symbol,'signal':pos['signal'],'qty':pos['qty'],
-             'entry_price':pos['entry_price'],'exit_price':price,
-             'pnl':pnl,'exit_time':datetime.now().strftime('%H:%M:%S')})
+        trade = {'symbol':symbol,'signal':pos['signal'],'qty':pos['qty'],
+                 'entry_price':pos['entry_price'],'exit_price':price,
+                 'pnl':pnl,'exit_time':datetime.now().strftime('%H:%M:%S')}
+        trade_history.setdefault(datetime.now().date(), []).append(trade)
+        append_trade_report(trade)
         print(f"{datetime.now()} | Closed {symbol} | {pos['signal']} | PnL:{pnl:.2f}")
         logging.info(f"Closed {symbol} | {pos['signal']} | PnL:{pnl:.2f}")
 
 def get_current_price(symbol):
     try:
-        df = yf.download(symbol, period="1d", interval="1m")
-        if not df.empty: return df['Close'][-1]
+        df = get_bars(symbol)
+        if df is not None and not df.empty: return df['Close'].values[-1]
     except: return None
     return None
 
 def monitor_positions():
-    for sym,pos in list(active_positions.items()):
+    with _positions_lock:
+        positions = dict(active_positions)
+    if positions: get_bars_batch(list(positions.keys()))
+    for sym,pos in positions.items():
         price = get_current_price(sym)
         if price is None: continue
         if pos['signal']=="BUY" and price<=pos['stop_loss']: exit_trade(sym, price)
         elif pos['signal']=="SELL" and price>=pos['stop_loss']: exit_trade(sym, price)
 
 def save_daily_report():
-    if not trade_history: return
-    filename = f"daily_trade_report_{datetime.now().strftime('%Y-%m-%d')}.csv"
-    all_trades = []
-    for _,t in trade_history.items(): all_trades.extend(t)
-    if all_trades:
-        keys = all_trades[0].keys()
-        with open(filename,'w',newline='') as f:
-            w = csv.DictWriter(f,keys); w.writeheader(); w.writerows(all_trades)
-        print(f"📊 Daily report saved to {filename}")
-        logging.info(f"Daily report saved: {filename}")
+    # Trades are appended to the CSV as they close; just flush the handle
+    global _report_file, _report_writer
+    if _report_file:
+        _report_file.close()
+        _report_file = _report_writer = None
+        print(f"📊 Daily report finalized for {datetime.now().date()}")
+        logging.info(f"Daily report finalized for {datetime.now().date()}")
 
 # ===== MAIN TRADING LOGIC =====
-def daily_trading():
+BACKTEST_SEM = asyncio.Semaphore(16)
+
+async def run_backtest(symbol):
+    async with BACKTEST_SEM:
+        return symbol, await asyncio.to_thread(backtest_vwap_rsi, symbol)
+
+async def daily_trading():
     print(f"🔍 Running daily trading at {datetime.now()}")
-    sentiment,score,stocks = fetch_and_analyze_sentiment()
-    for sym in stocks:
-        pnl,df = backtest_vwap_rsi(sym)
+    sentiment,score,stocks = await fetch_and_analyze_sentiment()
+    await asyncio.to_thread(get_bars_batch, stocks)
+    results = await asyncio.gather(*[run_backtest(sym) for sym in stocks])
+    for sym,(pnl,bars) in results:
         if pnl is None: continue
         sig = "BUY" if pnl>0 and sentiment=="Bullish" else "SELL" if pnl<0 and sentiment=="Bearish" else None
-        if sig: place_trade(sym,sig,sentiment,df)
+        if sig: place_trade(sym,sig,sentiment,bars)
+
+async def trading_loop():
+    while True:
+        await daily_trading()
+        await asyncio.sleep(60)
+
+async def monitor_loop():
+    # Runs independently so a slow symbol scan can't delay stop-losses
+    last_report_date = None
+    while True:
+        await asyncio.to_thread(monitor_positions)
+        now = datetime.now()
+        if now.strftime("%H:%M") >= "15:30" and last_report_date != now.date():
+            save_daily_report()
+            last_report_date = now.date()
+        await asyncio.sleep(60)
+
+async def main_loop():
+    await asyncio.gather(trading_loop(), monitor_loop())
 
 # ===== MAIN PROGRAM =====
 if __name__=="__main__":
     print("🚀 Starting Intraday Trading Bot...")
-    
+
     # Load stock symbols from NSE files
     ALL_STOCKS = load_symbols_from_nse_files(folder_path="nse_sector_files")
-    if not ALL_STOCKS: 
+    if not ALL_STOCKS:
         print("❌ No stock data loaded. Exiting...")
         exit()
+    build_ticker_index(ALL_STOCKS)
 
-    # Schedule tasks
-    schedule.every(1).minutes.do(daily_trading)
-    schedule.every(1).minutes.do(monitor_positions)
-    schedule.every().day.at("15:30").do(save_daily_report)
-
-    print("✅ Trading bot started. Waiting for schedule...")
+    print("✅ Trading bot started. Running event loop...")
     print(f"📊 Loaded symbols: {list(ALL_STOCKS.keys())[:10]}...")  # Show first 10
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+
+    asyncio.run(main_loop())